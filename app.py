@@ -26,7 +26,6 @@ from dotenv import load_dotenv, find_dotenv
 import ollama
 from langdetect import detect
 from langdetect.lang_detect_exception import LangDetectException
-import fitz  # PyMuPDF
 import google.generativeai as genai
 from utils.rag_handler import RAGHandler
 from utils.computer_control import ComputerController, COMPUTER_CONTROL_FUNCTIONS
@@ -108,8 +107,8 @@ socketio = SocketIO(app, cors_allowed_origins=config.socketio_cors_allowed, asyn
 
 listener_process = None
 
-# Initialize global RAG handler
-rag_handler = RAGHandler()
+# Initialize global RAG handler, caching its indexes between restarts
+rag_handler = RAGHandler(cache_dir=os.path.join(app.root_path, 'cache', 'rag'))
 
 # Initialize Computer Controller
 computer_controller = ComputerController(require_confirmation=True)
@@ -955,27 +954,6 @@ def get_python_executable():
     logger.error("No Python executable found")
     raise RuntimeError("No Python executable found in venv or system path")
 
-def load_pdf(pdf_path):
-    """Load text content from a PDF file."""
-    try:
-        doc = fitz.open(pdf_path)
-        texts = [page.get_text("text") for page in doc]
-        return texts
-    # Catch file related errors explicitly
-    except (OSError, RuntimeError) as e:
-        logger.error("Error loading PDF %s: %s", pdf_path, e)
-        return []
-
-def load_documents_from_directory(directory):
-    """Load text content from all documents in a directory."""
-    documents = []
-    for filename in os.listdir(directory):
-        file_path = os.path.join(directory, filename)
-        if filename.endswith('.pdf'):
-            documents.extend(load_pdf(file_path))
-        # Add more file type handlers here if needed
-    return documents
-
 @socketio.on('start_listener')
 def handle_start_listener():
     """Start the listener process for Twitch chat."""
@@ -7,11 +7,15 @@ and avatar animations.
 
 import asyncio
 import os
+import random
+import re
 import time
-import bleach
+from bleach.sanitizer import Cleaner
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from socketio import Client
+from socketio.exceptions import ConnectionError as SocketIOConnectionError
 from twitchio.ext import commands
 
 # Configure logging
@@ -21,6 +25,11 @@ logger = logging.getLogger(__name__)
 # Load configuration
 load_dotenv(encoding='utf-8')
 
+AI_COMMAND_PREFIX = '!ai'
+
+# Reused sanitizer; bleach.clean() builds a new Cleaner on every call
+cleaner = Cleaner()
+
 class Config:
     def __init__(self):
         self.fields = [
@@ -42,6 +51,13 @@ class Config:
         self.extra_delay_listener = float(self.extra_delay_listener)
         self.nb_spam_message = float(self.nb_spam_message)
         self.channel_name = [self.channel_name]  # Convert to list for twitchio
+        self.compile_name_pattern()
+
+    def compile_name_pattern(self):
+        """Precompile the regex extracting the follower/sub name between delimiters."""
+        self.name_pattern = re.compile(
+            f"{re.escape(self.delimiter_name)}(.+?){re.escape(self.delimiter_name_end)}"
+        )
 
     def update(self, **kwargs):
         for key, value in kwargs.items():
@@ -53,6 +69,8 @@ class Config:
             self.extra_delay_listener = float(self.extra_delay_listener)
         if 'NB_SPAM_MESSAGE' in kwargs:
             self.nb_spam_message = float(self.nb_spam_message)
+        if 'DELIMITER_NAME' in kwargs or 'DELIMITER_NAME_END' in kwargs:
+            self.compile_name_pattern()
 
 config = Config()
 
@@ -61,20 +79,29 @@ socket = Client()
 
 def connect_socket():
     retries = 10
+    delay = 0.1
     for attempt in range(retries):
         try:
-            socket.connect(f"{config.api_url}:{config.api_url_port}")
+            # Websocket only: the avatar page does the same, so skip the long-polling handshake
+            socket.connect(f"{config.api_url}:{config.api_url_port}", transports=['websocket'])
             logger.info("Connected to WebSocket server")
-            break
-        except (ConnectionError, TimeoutError) as e:
+            return
+        except (SocketIOConnectionError, ConnectionError, TimeoutError) as e:
             logger.error(f"Connection attempt {attempt + 1} failed: {e}")
-            time.sleep(2)
-    else:
-        logger.error("Failed to connect to WebSocket server after several attempts")
+            # Exponential backoff with jitter, capped so slow restarts are still retried
+            time.sleep(delay + random.random() * 0.1)
+            delay = min(delay * 2, 5.0)
+    logger.error("Failed to connect to WebSocket server after several attempts")
 
 connect_socket()
 
 class TwitchBot(commands.Bot):
+    # commands.Bot still provides a __dict__, but the per-message state gets slot descriptors
+    __slots__ = (
+        'processing', 'processing_time', 'user_last_message', 'reconnecting', 'sanitize_executor',
+        'ai_request_payload', 'display_payload'
+    )
+
     def __init__(self):
         super().__init__(
             token=config.twitch_token,
@@ -85,6 +112,13 @@ class TwitchBot(commands.Bot):
         self.processing = False
         self.processing_time = 0
         self.user_last_message = {}
+        self.reconnecting = False
+        # Keeps HTML sanitizing off the event loop; a single worker because the
+        # shared bleach Cleaner isn't thread-safe
+        self.sanitize_executor = ThreadPoolExecutor(max_workers=1)
+        # Reused emit payloads; the socketio client serializes them synchronously in emit()
+        self.ai_request_payload = {'username': '', 'message': ''}
+        self.display_payload = {'username': '', 'question': ''}
 
     async def event_ready(self):
         logger.info(f"Logged in as | {self.nick}")
@@ -94,73 +128,101 @@ class TwitchBot(commands.Bot):
         if message.echo:
             return
 
-        if self._handle_follow_sub_event(message):
+        # Most chat is neither a bot event nor a command: bail out before any other work
+        content = message.content
+        is_bot_event = message.author.name == config.bot_name_follow_sub
+        is_ai = content.startswith(AI_COMMAND_PREFIX)
+        if not is_bot_event and not is_ai:
+            return
+
+        if is_bot_event and self._handle_follow_sub_event(content):
             return
 
-        await self._handle_user_message(message)
+        if is_ai:
+            await self._handle_user_message(message)
 
-    def _handle_follow_sub_event(self, message):
-        if message.author.name == config.bot_name_follow_sub:
-            if config.key_word_follow in message.content:
-                self._emit_celebration('follow', message.content)
-                return True
-            elif config.key_word_sub in message.content:
-                self._emit_celebration('sub', message.content)
-                return True
+    def _handle_follow_sub_event(self, content):
+        if config.key_word_follow in content:
+            self._emit_celebration('follow', content)
+            return True
+        elif config.key_word_sub in content:
+            self._emit_celebration('sub', content)
+            return True
         return False
 
     def _emit_celebration(self, event_type, content):
-        name = content.split(config.delimiter_name)[1].split(config.delimiter_name_end)[0]
-        print(config.celebrate_follow_message)
-        print(config.celebrate_sub_message)
+        match = config.name_pattern.search(content)
+        if not match:
+            logger.warning("No name found in %s message: %s", event_type, content)
+            return
+        name = match.group(1)
         # Use custom messages from config
         if event_type == 'follow':
             message = f"{config.celebrate_follow_message} {name}"
         else:  # sub event
             message = f"{config.celebrate_sub_message} {name}"
 
+        logger.debug("Celebrating %s for %s", event_type, name)
         socket.emit('speak', {'text': message})
         socket.emit('trigger_event', {'event_type': event_type, 'username': name})
 
     async def _handle_user_message(self, message):
-        current_time = time.time()
+        current_time = time.monotonic()
         if self.processing and current_time - self.processing_time < config.extra_delay_listener:
             return
 
         user_id = message.author.name
         if self._is_spam(user_id, message.content, current_time):
-            logger.info(f"Spam detected from {user_id}: {message.content}")
+            logger.warning("Spam detected from %s: %s", user_id, message.content)
             return
 
-        self.user_last_message[user_id] = (message.content, current_time)
+        self.user_last_message[user_id] = (hash(message.content), current_time)
 
-        if message.content.startswith('!ai'):
-            await self._process_ai_request(message)
+        await self._process_ai_request(message)
 
     def _is_spam(self, user_id, content, current_time):
         if user_id in self.user_last_message:
-            last_message, last_time = self.user_last_message[user_id]
-            return (current_time - last_time < config.nb_spam_message and content == last_message)
+            last_hash, last_time = self.user_last_message[user_id]
+            return (current_time - last_time < config.nb_spam_message and hash(content) == last_hash)
         return False
 
     async def _process_ai_request(self, message):
-        user_input = message.content[4:].strip()
+        user_input = message.content[len(AI_COMMAND_PREFIX):].strip()
         if not user_input:
             await message.channel.send(f"{message.author.name}, please provide a valid question.")
             return
 
         self.processing = True
-        self.processing_time = time.time()
+        self.processing_time = time.monotonic()
 
         try:
-            sanitized_input = bleach.clean(user_input)
-            socket.emit('trigger_ai_request', {'username': message.author.name, 'message': sanitized_input})
-            socket.emit('display_question', {'username': message.author.name, 'question': sanitized_input})
+            sanitized_input = await self.loop.run_in_executor(self.sanitize_executor, cleaner.clean, user_input)
+            self.ai_request_payload['username'] = message.author.name
+            self.ai_request_payload['message'] = sanitized_input
+            socket.emit('trigger_ai_request', self.ai_request_payload)
+            self.display_payload['username'] = message.author.name
+            self.display_payload['question'] = sanitized_input
+            socket.emit('display_question', self.display_payload)
         except Exception as e:
             logger.error(f"Error processing AI request: {e}")
-        finally:
-            await asyncio.sleep(config.extra_delay_listener)
+            # Don't hold up other users while the connection is repaired
             self.processing = False
+            if not self.reconnecting:
+                self.loop.create_task(self._reconnect())
+            return
+
+        await asyncio.sleep(config.extra_delay_listener)
+        self.processing = False
+
+    async def _reconnect(self):
+        self.reconnecting = True
+        try:
+            socket.disconnect()
+            await asyncio.sleep(config.extra_delay_listener)
+            # connect_socket blocks while retrying, keep it off the event loop
+            await self.loop.run_in_executor(None, connect_socket)
+        finally:
+            self.reconnecting = False
 
 if __name__ == "__main__":
     bot = TwitchBot()
@@ -177,4 +239,5 @@ if __name__ == "__main__":
             logger.error(f"Error updating twitch listener configuration: {e}")
 
     bot.run()
+    bot.sanitize_executor.shutdown(wait=False)
     socket.disconnect()
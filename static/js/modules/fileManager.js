@@ -137,6 +137,10 @@ export function handleDocumentUploaded(response) {
     }
 }
 
+export function handleDocumentIndexed(response) {
+    showNotification(response.status === 'success' ? 'success' : 'error', response.message);
+}
+
 export function loadDocuments() {
     emit('list_documents');
 }
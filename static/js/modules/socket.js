@@ -2,7 +2,7 @@ import { speak } from './speech.js';
 import { showQuestionDisplay, handleInitialConfig, handleSaveConfigResponse, handleListenerUpdate, updateTwitchToken } from './ui.js';
 import { triggerFireworks } from './effects.js';
 import { loadAvatarModel } from './model.js';
-import { handleDocumentsList, handleDocumentDeleted, handleDocumentUploaded } from './fileManager.js';
+import { handleDocumentsList, handleDocumentDeleted, handleDocumentUploaded, handleDocumentIndexed } from './fileManager.js';
 
 // Export the socket instance
 export const socket = io({
@@ -33,6 +33,7 @@ export function initializeSocket() {
     socket.on('documents_list', handleDocumentsList);
     socket.on('document_deleted', handleDocumentDeleted);
     socket.on('document_uploaded', handleDocumentUploaded);
+    socket.on('document_indexed', handleDocumentIndexed);
     socket.on('update_twitch_token', (data) => updateTwitchToken(data));
 }
 
@@ -5,18 +5,218 @@ It implements a set of actions that allow the AI to interact with the computer t
 """
 
 import os
+import re
+import atexit
+import functools
 import subprocess
+import threading
 import logging
 import json
 import webbrowser
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
+from collections import OrderedDict
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus, urljoin
+import soupsieve
 from bs4 import BeautifulSoup
+from lxml import etree
 
 logger = logging.getLogger(__name__)
 
+# Whitelist of safe shell commands, matched as a whole first word (ipconfig only with /all)
+SAFE_COMMAND_RE = re.compile(
+    r'^(?:dir|ls|echo|date|time|whoami|hostname|ipconfig\s+/all)(?:\s|$)',
+    re.IGNORECASE
+)
+
+URL_SCHEMES = ('http://', 'https://')
+SEARCH_URL = 'https://www.google.com/search?q='
+
+# Project root directory (where app.py is located) and the folder LLM-created files go to
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'output')
+
+# Directories create_file may write to with an absolute path, normalised once at import
+SAFE_ROOTS = tuple(
+    os.path.normcase(os.path.abspath(path))
+    for path in (os.path.join(os.path.expanduser('~'), 'Documents'),
+                 os.path.join(os.path.expanduser('~'), 'Desktop'),
+                 OUTPUT_DIR)
+)
+
+# Friendly application names mapped to their Windows executables
+COMMON_APPS = MappingProxyType({
+    'notepad': 'notepad.exe',
+    'calculator': 'calc.exe',
+    'paint': 'mspaint.exe',
+    'explorer': 'explorer.exe',
+    'chrome': 'chrome.exe',
+    'firefox': 'firefox.exe',
+    'edge': 'msedge.exe',
+    'vscode': 'code',
+    'word': 'winword.exe',
+    'excel': 'excel.exe',
+    'powerpoint': 'powerpnt.exe',
+})
+
+# Shared HTTP session so repeated scrapes reuse pooled keep-alive connections
+http_session = requests.Session()
+# Set a user agent to avoid being blocked
+http_session.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+})
+_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=Retry(total=2, backoff_factor=0.3))
+http_session.mount('http://', _adapter)
+http_session.mount('https://', _adapter)
+
+# Persistent pool for fetching several pages concurrently (network I/O releases the GIL)
+scrape_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='scrape')
+atexit.register(scrape_executor.shutdown)
+
+# Maximum size of a page body the scrapers will download
+MAX_RESPONSE_BYTES = 5 * 1024 * 1024
+
+# Maximum number of characters of page text returned by scrape_webpage
+SCRAPE_TEXT_LIMIT = 5000
+
+# LRU of scraped pages keyed by (url, selector), revalidated with conditional GETs
+PAGE_CACHE_SIZE = 32
+page_cache = OrderedDict()
+page_cache_lock = threading.Lock()
+
+def _read_anchor_events(parser):
+    """Yield (href, text) for the anchors the pull parser has finished so far."""
+    for _, element in parser.read_events():
+        href = element.get('href')
+        if href:
+            yield href, ''.join(text.strip() for text in element.itertext())
+        # Drop the parsed subtree to keep memory flat on large pages
+        element.clear()
+
+def _iter_chunks_limited(response, chunk_size=65536):
+    """Yield the body of a streamed response, failing once it exceeds MAX_RESPONSE_BYTES."""
+    if int(response.headers.get('Content-Length') or 0) > MAX_RESPONSE_BYTES:
+        raise Exception(f"Page too large (max {MAX_RESPONSE_BYTES // (1024 * 1024)}MB)")
+    received = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        received += len(chunk)
+        if received > MAX_RESPONSE_BYTES:
+            raise Exception(f"Page too large (max {MAX_RESPONSE_BYTES // (1024 * 1024)}MB)")
+        yield chunk
+
+def _read_limited(response):
+    """Read a streamed response body into memory, bounded by MAX_RESPONSE_BYTES."""
+    buffer = bytearray()
+    for chunk in _iter_chunks_limited(response):
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+def _iter_anchors(response, chunk_size=16384):
+    """Incrementally parse a streamed HTML response, yielding (href, text) per link."""
+    chunks = _iter_chunks_limited(response, chunk_size)
+    first_chunk = next(chunks, b'')
+    # The parser only sees bytes: use the header charset, else let it sniff a <meta>
+    # declaration or BOM, and assume UTF-8 for pages that declare nothing
+    if 'charset=' in response.headers.get('Content-Type', '').lower():
+        encoding = response.encoding
+    elif b'charset' in first_chunk.lower() or first_chunk.startswith((b'\xef\xbb\xbf', b'\xff\xfe', b'\xfe\xff')):
+        encoding = None
+    else:
+        encoding = 'utf-8'
+    parser = etree.HTMLPullParser(events=('end',), tag='a', encoding=encoding)
+    parser.feed(first_chunk)
+    yield from _read_anchor_events(parser)
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from _read_anchor_events(parser)
+    parser.close()
+    yield from _read_anchor_events(parser)
+
+def _get_cached_page(key):
+    """Return the cached (etag, last_modified, content) for a scrape, marking it recently used."""
+    with page_cache_lock:
+        cached = page_cache.get(key)
+        if cached:
+            page_cache.move_to_end(key)
+        return cached
+
+def _store_cached_page(key, etag, last_modified, content):
+    """Cache scraped content when the server gave us a validator to revalidate it with."""
+    if not etag and not last_modified:
+        return
+    with page_cache_lock:
+        page_cache[key] = (etag, last_modified, content)
+        page_cache.move_to_end(key)
+        if len(page_cache) > PAGE_CACHE_SIZE:
+            page_cache.popitem(last=False)
+
+def _join_text_limited(strings, limit):
+    """Join strings with newlines, reading only as many as needed to fill limit characters."""
+    parts = []
+    total = -1  # no separator before the first string
+    for text in strings:
+        parts.append(text)
+        total += len(text) + 1
+        if total > limit:
+            return '\n'.join(parts)[:limit] + "\n\n... (content truncated)"
+    return '\n'.join(parts)
+
+def _is_in_safe_root(path):
+    """Check whether an absolute path lies inside one of SAFE_ROOTS."""
+    path = os.path.normcase(path)
+    for root in SAFE_ROOTS:
+        try:
+            # Compares whole path components, so ~/Desktopevil doesn't pass as ~/Desktop
+            if os.path.commonpath([path, root]) == root:
+                return True
+        except ValueError:
+            # Different drives on Windows
+            continue
+    return False
+
+@functools.lru_cache(maxsize=128)
+def _compile_selector(selector):
+    """Compile a CSS selector once and reuse it across scrapes."""
+    return soupsieve.compile(selector)
+
+@functools.lru_cache(maxsize=64)
+def _format_directory_listing(directory_path, mtime_ns):
+    """Build the listing of a directory, cached per (path, mtime) so unchanged directories are not rescanned."""
+    # Separate folders and files, scandir caches the entry type from the directory read
+    folders, files = [], []
+    with os.scandir(directory_path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                folders.append(entry.name)
+            elif entry.is_file():
+                files.append(entry.name)
+    
+    # Single join instead of repeated string concatenation
+    return ''.join((
+        f"Directory: {directory_path}\n\n",
+        "Folders:\n", "\n".join([f"  📁 {folder}" for folder in folders]), "\n\n",
+        "Files:\n", "\n".join([f"  📄 {file}" for file in files]),
+    ))
+
 class ComputerController:
     """Handles computer control actions with safety checks and logging."""
+
+    # Names of the methods that can be called through execute_action
+    ALLOWED_ACTIONS = frozenset((
+        'open_application',
+        'open_website',
+        'create_file',
+        'read_file',
+        'list_directory',
+        'run_command',
+        'search_web',
+        'scrape_webpage',
+        'extract_links',
+    ))
     
     def __init__(self, require_confirmation=True):
         """
@@ -26,17 +226,6 @@ class ComputerController:
             require_confirmation: Whether to require user confirmation for actions
         """
         self.require_confirmation = require_confirmation
-        self.allowed_actions = {
-            'open_application': self.open_application,
-            'open_website': self.open_website,
-            'create_file': self.create_file,
-            'read_file': self.read_file,
-            'list_directory': self.list_directory,
-            'run_command': self.run_command,
-            'search_web': self.search_web,
-            'scrape_webpage': self.scrape_webpage,
-            'extract_links': self.extract_links,
-        }
     
     def execute_action(self, action_name, parameters):
         """
@@ -49,7 +238,7 @@ class ComputerController:
         Returns:
             dict: Result of the action with status and message
         """
-        if action_name not in self.allowed_actions:
+        if action_name not in self.ALLOWED_ACTIONS:
             return {
                 'status': 'error',
                 'message': f'Unknown action: {action_name}'
@@ -57,7 +246,7 @@ class ComputerController:
         
         try:
             logger.info(f"Executing action: {action_name} with params: {parameters}")
-            action_func = self.allowed_actions[action_name]
+            action_func = getattr(self, action_name)
             result = action_func(**parameters)
             return {
                 'status': 'success',
@@ -80,24 +269,15 @@ class ComputerController:
         Returns:
             str: Success message
         """
-        common_apps = {
-            'notepad': 'notepad.exe',
-            'calculator': 'calc.exe',
-            'paint': 'mspaint.exe',
-            'explorer': 'explorer.exe',
-            'chrome': 'chrome.exe',
-            'firefox': 'firefox.exe',
-            'edge': 'msedge.exe',
-            'vscode': 'code',
-            'word': 'winword.exe',
-            'excel': 'excel.exe',
-            'powerpoint': 'powerpnt.exe',
-        }
-        
-        app_to_open = common_apps.get(application_name.lower(), application_name)
+        app_to_open = COMMON_APPS.get(application_name.lower(), application_name)
         
         try:
-            subprocess.Popen(app_to_open, shell=True)
+            if application_name.lower() in COMMON_APPS and hasattr(os, 'startfile'):
+                # ShellExecute launches known apps directly, without an intermediate cmd.exe
+                os.startfile(app_to_open)
+            else:
+                # No shell, and don't let the child inherit our console or handles
+                subprocess.Popen([app_to_open], creationflags=getattr(subprocess, 'DETACHED_PROCESS', 0))
             return f"Opened {application_name}"
         except Exception as e:
             raise Exception(f"Failed to open {application_name}: {e}")
@@ -112,7 +292,7 @@ class ComputerController:
         Returns:
             str: Success message
         """
-        if not url.startswith(('http://', 'https://')):
+        if not url.startswith(URL_SCHEMES):
             url = 'https://' + url
         
         webbrowser.open(url)
@@ -129,26 +309,17 @@ class ComputerController:
         Returns:
             str: Success message
         """
-        # Get the project root directory (where app.py is located)
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        output_dir = os.path.join(project_root, 'output')
-        
         # If path is relative or just a filename, put it in the output directory
         if not os.path.isabs(file_path):
-            file_path = os.path.join(output_dir, file_path)
+            file_path = os.path.join(OUTPUT_DIR, file_path)
         else:
             # For absolute paths, check if they're in safe directories
-            safe_paths = [
-                os.path.expanduser('~\\Documents'), 
-                os.path.expanduser('~\\Desktop'),
-                output_dir
-            ]
             file_path = os.path.abspath(file_path)
             
-            if not any(file_path.startswith(safe_path) for safe_path in safe_paths):
+            if not _is_in_safe_root(file_path):
                 # If not in safe paths, save to output directory instead
                 file_name = os.path.basename(file_path)
-                file_path = os.path.join(output_dir, file_name)
+                file_path = os.path.join(OUTPUT_DIR, file_name)
                 logger.warning(f"Path not in safe directories, saving to output folder: {file_path}")
         
         # Create directory if it doesn't exist
@@ -157,6 +328,9 @@ class ComputerController:
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(content)
         
+        # Directory mtime granularity can be coarse (e.g. FAT), so don't rely on it alone
+        self.clear_directory_cache()
+        
         return f"Created file: {file_path}"
     
     def read_file(self, file_path):
@@ -178,10 +352,12 @@ class ComputerController:
         if os.path.getsize(file_path) > 1024 * 1024:
             raise Exception("File too large to read (max 1MB)")
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Read raw bytes and decode once, skipping the incremental text-mode decoder
+        with open(file_path, 'rb') as f:
+            data = f.read()
         
-        return content
+        # Keep the universal-newline behaviour of text mode
+        return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
     
     def list_directory(self, directory_path=None):
         """
@@ -201,17 +377,14 @@ class ComputerController:
         if not os.path.exists(directory_path):
             raise Exception(f"Directory not found: {directory_path}")
         
-        items = os.listdir(directory_path)
-        
-        # Separate folders and files
-        folders = [item for item in items if os.path.isdir(os.path.join(directory_path, item))]
-        files = [item for item in items if os.path.isfile(os.path.join(directory_path, item))]
-        
-        result = f"Directory: {directory_path}\n\n"
-        result += "Folders:\n" + "\n".join(f"  📁 {folder}" for folder in folders) + "\n\n"
-        result += "Files:\n" + "\n".join(f"  📄 {file}" for file in files)
-        
-        return result
+        # The directory mtime changes whenever entries are added, removed or renamed
+        mtime_ns = os.stat(directory_path).st_mtime_ns
+        return _format_directory_listing(directory_path, mtime_ns)
+    
+    @classmethod
+    def clear_directory_cache(cls):
+        """Drop all cached directory listings."""
+        _format_directory_listing.cache_clear()
     
     def run_command(self, command):
         """
@@ -223,13 +396,8 @@ class ComputerController:
         Returns:
             str: Command output
         """
-        # Whitelist of safe commands
-        safe_commands = ['dir', 'ls', 'echo', 'date', 'time', 'whoami', 'hostname', 'ipconfig /all']
-        
-        # Check if command starts with a safe command
-        is_safe = any(command.lower().startswith(safe_cmd) for safe_cmd in safe_commands)
-        
-        if not is_safe:
+        # Check if the command is a whitelisted one
+        if not SAFE_COMMAND_RE.match(command):
             raise Exception(f"Command not allowed for security reasons: {command}")
         
         result = subprocess.run(
@@ -252,7 +420,7 @@ class ComputerController:
         Returns:
             str: Success message
         """
-        search_url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
+        search_url = SEARCH_URL + quote_plus(query)
         webbrowser.open(search_url)
         return f"Searching for: {query}"
     
@@ -267,21 +435,30 @@ class ComputerController:
         Returns:
             str: Extracted content from the webpage
         """
-        if not url.startswith(('http://', 'https://')):
+        if not url.startswith(URL_SCHEMES):
             url = 'https://' + url
         
         try:
-            # Set a user agent to avoid being blocked
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
+            # Revalidate a previously scraped page instead of downloading it again
+            cache_key = (url, selector)
+            cached = _get_cached_page(cache_key)
+            headers = {}
+            if cached:
+                etag, last_modified, cached_content = cached
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
             
-            # Fetch the webpage
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
+            # Fetch the webpage, refusing to buffer more than MAX_RESPONSE_BYTES
+            with http_session.get(url, headers=headers, timeout=10, stream=True) as response:
+                if cached and response.status_code == 304:
+                    return f"Content from {url}:\n\n{cached_content}"
+                response.raise_for_status()
+                html = _read_limited(response)
             
             # Parse the HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = BeautifulSoup(html, 'lxml')
             
             # Remove script and style elements
             for script in soup(["script", "style"]):
@@ -289,18 +466,16 @@ class ComputerController:
             
             if selector:
                 # Extract specific elements based on CSS selector
-                elements = soup.select(selector)
+                elements = _compile_selector(selector).select(soup, limit=10)  # Limit to 10 elements
                 if elements:
-                    content = '\n\n'.join([elem.get_text(strip=True) for elem in elements[:10]])  # Limit to 10 elements
+                    content = '\n\n'.join([elem.get_text(strip=True) for elem in elements])
                 else:
                     content = "No elements found matching the selector"
             else:
-                # Get all text content
-                content = soup.get_text(separator='\n', strip=True)
-                # Limit content length
-                if len(content) > 5000:
-                    content = content[:5000] + "\n\n... (content truncated)"
+                # Get the text content, stopping as soon as the length limit is exceeded
+                content = _join_text_limited(soup.stripped_strings, SCRAPE_TEXT_LIMIT)
             
+            _store_cached_page(cache_key, response.headers.get('ETag'), response.headers.get('Last-Modified'), content)
             return f"Content from {url}:\n\n{content}"
             
         except requests.Timeout:
@@ -310,6 +485,19 @@ class ComputerController:
         except Exception as e:
             raise Exception(f"Error parsing webpage: {e}")
     
+    def scrape_many(self, urls, selector=None):
+        """
+        Scrape several webpages concurrently.
+        
+        Args:
+            urls: URLs of the webpages to scrape
+            selector: Optional CSS selector applied to every page
+            
+        Returns:
+            list: Extracted content for each URL, in the same order
+        """
+        return list(scrape_executor.map(lambda url: self.scrape_webpage(url, selector), urls))
+    
     def extract_links(self, url, filter_text=None):
         """
         Extract links from a webpage.
@@ -321,40 +509,32 @@ class ComputerController:
         Returns:
             str: List of links found on the page
         """
-        if not url.startswith(('http://', 'https://')):
+        if not url.startswith(URL_SCHEMES):
             url = 'https://' + url
         
+        filter_lower = filter_text.lower() if filter_text else None
+        
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract all links
             links = []
-            for link in soup.find_all('a', href=True):
-                href = link.get('href')
-                text = link.get_text(strip=True)
+            # Stream the page and stop downloading/parsing once enough links are found
+            with http_session.get(url, timeout=10, stream=True) as response:
+                response.raise_for_status()
                 
-                # Convert relative URLs to absolute
-                if href.startswith('/'):
-                    from urllib.parse import urljoin
-                    href = urljoin(url, href)
-                
-                # Filter if needed
-                if filter_text:
-                    if filter_text.lower() in text.lower() or filter_text.lower() in href.lower():
+                for href, text in _iter_anchors(response):
+                    # Convert relative URLs to absolute, absolute links skip the URL parse
+                    if not href.startswith(URL_SCHEMES):
+                        href = urljoin(url, href)
+                    
+                    # Filter if needed
+                    if filter_text:
+                        if filter_lower in text.lower() or filter_lower in href.lower():
+                            links.append({'text': text, 'url': href})
+                    else:
                         links.append({'text': text, 'url': href})
-                else:
-                    links.append({'text': text, 'url': href})
-                
-                # Limit to 20 links
-                if len(links) >= 20:
-                    break
+                    
+                    # Limit to 20 links
+                    if len(links) >= 20:
+                        break
             
             if not links:
                 return "No links found on the page"
@@ -2,8 +2,10 @@
 
 import os
 import logging
+import threading
 from werkzeug.utils import secure_filename
 import humanize
+from eventlet import tpool
 
 logger = logging.getLogger(__name__)
 
@@ -22,37 +24,37 @@ class FileManager:
 
         # List RAG documents from static/doc
         if os.path.exists(self.doc_dir):
-            for filename in os.listdir(self.doc_dir):
-                file_path = os.path.join(self.doc_dir, filename)
-                if os.path.isfile(file_path):
-                    stats = os.stat(file_path)
-                    documents.append({
-                        'name': filename,
-                        'type': os.path.splitext(filename)[1][1:].upper() or 'FILE',
-                        'size': humanize.naturalsize(stats.st_size),
-                        'category': 'rag',
-                        'location': 'RAG Documents'
-                    })
+            # scandir entries carry the file type, and cache stat() after the first call
+            with os.scandir(self.doc_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        documents.append({
+                            'name': entry.name,
+                            'type': os.path.splitext(entry.name)[1][1:].upper() or 'FILE',
+                            'size': humanize.naturalsize(entry.stat().st_size),
+                            'category': 'rag',
+                            'location': 'RAG Documents'
+                        })
 
         # List LLM created files from output directory
         if os.path.exists(self.output_dir):
-            for filename in os.listdir(self.output_dir):
-                file_path = os.path.join(self.output_dir, filename)
-                if os.path.isfile(file_path) and not filename.startswith('.'):
-                    stats = os.stat(file_path)
-                    documents.append({
-                        'name': filename,
-                        'type': os.path.splitext(filename)[1][1:].upper() or 'FILE',
-                        'size': humanize.naturalsize(stats.st_size),
-                        'category': 'llm',
-                        'location': 'LLM Output'
-                    })
+            with os.scandir(self.output_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and not entry.name.startswith('.'):
+                        documents.append({
+                            'name': entry.name,
+                            'type': os.path.splitext(entry.name)[1][1:].upper() or 'FILE',
+                            'size': humanize.naturalsize(entry.stat().st_size),
+                            'category': 'llm',
+                            'location': 'LLM Output'
+                        })
 
         return documents
 
     def delete_document(self, filename, category='rag'):
-        """Delete a document given its filename and category, and reinitialize the RAG handler if needed.
+        """Delete a document given its filename and category.
 
+        RAG documents must then be dropped from the index with reindex_documents().
         Returns a dict with status and a message.
         """
         if not filename:
@@ -68,9 +70,6 @@ class FileManager:
         try:
             if os.path.exists(file_path):
                 os.remove(file_path)
-                # Only reinitialize RAG if deleting from RAG documents
-                if category == 'rag':
-                    self.rag_handler.initialize(self.doc_dir)
                 return {'status': 'success', 'message': f'Deleted {filename}'}
             return {'status': 'error', 'message': 'File not found'}
         except OSError as e:
@@ -78,9 +77,10 @@ class FileManager:
             return {'status': 'error', 'message': str(e)}
 
     def upload_document(self, file_data):
-        """Upload a new document and update the RAG handler.
+        """Save a new document; it must then be indexed with index_document().
 
-        Returns a dict with status, a message, and file metadata.
+        Returns a dict with status, a message, file metadata, and whether an
+        existing file was replaced.
         """
         if not file_data:
             return {'status': 'error', 'message': 'No file provided'}
@@ -94,16 +94,16 @@ class FileManager:
         try:
             os.makedirs(self.doc_dir, exist_ok=True)
             file_path = os.path.join(self.doc_dir, filename)
+            replaced = os.path.exists(file_path)
 
             with open(file_path, 'wb') as f:
                 f.write(content)
 
-            self.rag_handler.initialize(self.doc_dir)
-
             stats = os.stat(file_path)
             return {
                 'status': 'success',
-                'message': f'Uploaded {filename}',
+                'message': f'Uploaded {filename}, indexing...',
+                'replaced': replaced,
                 'file': {
                     'name': filename,
                     'type': os.path.splitext(filename)[1][1:].upper(),
@@ -114,8 +114,43 @@ class FileManager:
             logger.error("Error uploading file: %s", e)
             return {'status': 'error', 'message': str(e)}
 
+    def index_document(self, filename, replaced=False):
+        """Add an uploaded document to the RAG index.
+
+        Returns a dict with status and a message.
+        """
+        if replaced:
+            # The previous version is indexed too, rebuild from the directory
+            self.rag_handler.initialize(self.doc_dir)
+        else:
+            self.rag_handler.reindex_incremental([os.path.join(self.doc_dir, secure_filename(filename))])
+        if not self.rag_handler.is_initialized:
+            return {'status': 'error', 'message': f'Failed to index {filename}'}
+        return {'status': 'success', 'message': f'{filename} is ready'}
+
+    def reindex_documents(self):
+        """Rebuild the RAG index from the documents directory.
+
+        Returns a dict with status and a message.
+        """
+        self.rag_handler.initialize(self.doc_dir)
+        return {'status': 'success', 'message': 'Documents reindexed'}
+
 def setup_file_manager_routes(socketio, file_manager):
     """Setup SocketIO routes for file management."""
+    # RAGHandler updates must not overlap: uploads and deletes are indexed one at a time
+    index_lock = threading.Lock()
+
+    def index_in_background(index_func, *args):
+        """Run a RAG (re)index outside the handler and emit the result when done."""
+        def task():
+            # Background tasks are green threads: run the CPU-bound indexing in a
+            # real OS thread so the eventlet hub keeps serving other clients
+            with index_lock:
+                result = tpool.execute(index_func, *args)
+            socketio.emit('document_indexed', result)
+        socketio.start_background_task(task)
+
     @socketio.on('list_documents')
     def handle_list_documents(data=None):  # added parameter data
         """Handle listing documents and emit the documents list."""
@@ -129,10 +164,14 @@ def setup_file_manager_routes(socketio, file_manager):
         category = data.get('category', 'rag')
         result = file_manager.delete_document(filename, category)
         socketio.emit('document_deleted', result)
-        socketio.emit('document_deleted', result)
+        # Only reindex RAG if deleting from RAG documents
+        if result['status'] == 'success' and category == 'rag':
+            index_in_background(file_manager.reindex_documents)
 
     @socketio.on('upload_document')
     def handle_upload_document(data):
         """Handle file upload and emit the upload result."""
         result = file_manager.upload_document(data.get('file'))
         socketio.emit('document_uploaded', result)
+        if result['status'] == 'success':
+            index_in_background(file_manager.index_document, result['file']['name'], result['replaced'])
@@ -6,23 +6,35 @@ This module implements a hybrid retrieval system combining:
 """
 
 import os
+import hashlib
+import json
 import logging
+from collections import OrderedDict, namedtuple
 import numpy as np
 import fitz  # PyMuPDF
-from rank_bm25 import BM25Okapi
+import bm25s
 from sentence_transformers import SentenceTransformer
 import faiss
 
 logger = logging.getLogger(__name__)
 
+# Use bm25s' numba JIT scorer when numba is installed, plain numpy otherwise
+BM25_BACKEND = 'auto'
+
+# Reciprocal Rank Fusion weights 1 / (rank + k), where k=60 is standard
+RRF_K = 60
+RRF_WEIGHTS = 1.0 / (np.arange(4096) + RRF_K)
+
+# Everything a query reads, published as a whole once an index update is complete
+SearchIndex = namedtuple('SearchIndex', ['documents', 'bm25', 'bm25_pending', 'faiss_index'])
+
 def load_pdf(pdf_path):
     """Load text content from a PDF file."""
     try:
-        doc = fitz.open(pdf_path)
-        texts = [page.get_text("text") for page in doc]
-        doc.close()  # Properly close the PDF
-        return texts
-    except (fitz.FileDataError, fitz.FileDataError, fitz.FileDataError) as e:
+        # The context manager closes the PDF even when extraction fails
+        with fitz.open(pdf_path) as doc:
+            return [page.get_text("text") for page in doc]
+    except (fitz.FileDataError, RuntimeError, FileNotFoundError) as e:
         logger.error("Error loading PDF %s: %s", pdf_path, e)
         return []
 
@@ -38,6 +50,23 @@ def load_txt(txt_path):
         logger.error("Error loading TXT %s: %s", txt_path, e)
         return []
 
+SUPPORTED_LOADERS = {
+    '.pdf': load_pdf,
+    '.txt': load_txt
+}
+
+def load_document(file_path):
+    """Load text content from a single supported document, or nothing if unsupported."""
+    filename = os.path.basename(file_path)
+    file_extension = os.path.splitext(filename)[1].lower()
+
+    if file_extension in SUPPORTED_LOADERS:
+        logger.info("Loading %s file: %s", file_extension, filename)
+        return SUPPORTED_LOADERS[file_extension](file_path)
+
+    logger.debug("Skipping unsupported file: %s", filename)
+    return []
+
 def load_documents_from_directory(directory):
     """Load text content from all supported documents in a directory."""
     documents = []
@@ -45,21 +74,10 @@ def load_documents_from_directory(directory):
         logger.warning("Documents directory does not exist: %s", directory)
         return documents
 
-    supported_extensions = {
-        '.pdf': load_pdf,
-        '.txt': load_txt
-    }
-
-    for filename in os.listdir(directory):
-        file_path = os.path.join(directory, filename)
-        file_extension = os.path.splitext(filename)[1].lower()
-
-        if file_extension in supported_extensions:
-            logger.info("Loading %s file: %s", file_extension, filename)
-            loader = supported_extensions[file_extension]
-            documents.extend(loader(file_path))
-        else:
-            logger.debug("Skipping unsupported file: %s", filename)
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file():
+                documents.extend(load_document(entry.path))
 
     logger.info("Loaded %s text segments from %s", len(documents), directory)
     return documents
@@ -73,16 +91,52 @@ class RAGHandler:
     - FAISS for fast semantic similarity search
     - BM25 for keyword-based lexical search
     - Reciprocal Rank Fusion (RRF) to combine results
+
+    The FAISS index is HNSW over 8-bit scalar-quantized vectors for corpora
+    under HNSW_MAX_VECTORS segments and IVF+PQ (IVF_PQ_FACTORY) above that,
+    both ranking by inner product over normalized embeddings (cosine similarity).
+
+    When a cache_dir is given, the BM25 index is persisted there and reloaded
+    as long as the corpus hasn't changed. So are the loaded documents, their
+    embeddings (memory-mapped on load) and the FAISS index, keyed by the names,
+    sizes and modification times of the files in the documents directory.
+
+    Added documents are appended to the existing FAISS index; BM25 is only
+    rebuilt once they exceed BM25_REBUILD_RATIO of the corpus, and FAISS once
+    the corpus outgrows FAISS_RETRAIN_RATIO times what its quantizer was trained on.
+
+    When BM25's top_n-th score is bm25_decisive_ratio times the next one, the
+    lexical results are returned as-is and the query isn't embedded at all.
+    Pass None to always run the hybrid search.
+
+    initialize() and add_documents() build the new documents and indices on the
+    side and publish them to queries as one SearchIndex, so queries may run while
+    an update is in progress. Updates themselves must not run concurrently.
     """
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
+    INDEX_METRIC = faiss.METRIC_INNER_PRODUCT  # Cosine similarity on normalized embeddings
+    HNSW_MAX_VECTORS = 10_000
+    IVF_PQ_FACTORY = "IVF100,PQ8"
+    QUERY_CACHE_SIZE = 1024
+    BM25_REBUILD_RATIO = 0.1
+    FAISS_RETRAIN_RATIO = 2
+
+    def __init__(self, model_name='all-MiniLM-L6-v2', cache_dir=None, bm25_decisive_ratio=3.0):
         self.documents = []  # Original documents
-        self.corpus = []     # Preprocessed documents
         self.bm25 = None
+        self.bm25_pending = 0  # Documents added since the BM25 index was built
+        self.bm25_decisive_ratio = bm25_decisive_ratio
+        self.query_count = 0
+        self.bm25_decisive_count = 0  # Queries answered by BM25 alone
         self.faiss_index = None
+        self.faiss_trained_count = 0  # Vectors the FAISS quantizer was trained on
         self.embeddings = None
         self.model = None
         self.model_name = model_name
+        self.query_embeddings = OrderedDict()  # LRU of query -> embedding
+        self.document_embeddings = {}  # document_key -> embedding
+        self.cache_dir = cache_dir
         self.is_initialized = False
+        self.search_index = None  # What queries read, see publish_index()
 
     def load_embedding_model(self):
         """Load the sentence transformer model for embeddings."""
@@ -90,18 +144,136 @@ class RAGHandler:
             try:
                 logger.info("Loading embedding model: %s", self.model_name)
                 self.model = SentenceTransformer(self.model_name)
+                if self.model.device.type == 'cuda':
+                    # Half precision roughly doubles GPU encoding throughput; CPUs
+                    # without native bf16/fp16 support would get slower, so they stay in fp32
+                    self.model.half()
+                    logger.info("Embedding model running in fp16 on %s", self.model.device)
                 logger.info("Embedding model loaded successfully")
             except Exception as e:
                 logger.error("Error loading embedding model: %s", e)
                 raise
 
-    def preprocess_text(self, text):
-        """Preprocess text for BM25 indexing."""
-        return text.lower().strip()
+    def tokenize(self, texts):
+        """Tokenize a list of texts into lowercased word lists for BM25."""
+        return bm25s.tokenize(texts, stopwords=None, return_ids=False, show_progress=False)
+
+    def corpus_hash(self):
+        """Return a digest identifying the current set of documents."""
+        digest = hashlib.blake2b(digest_size=16)
+        for doc in self.documents:
+            digest.update(doc.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def load_cached_bm25(self, corpus_hash):
+        """Load the persisted BM25 index if it was built from the same corpus."""
+        if not self.cache_dir:
+            return None
+
+        bm25_dir = os.path.join(self.cache_dir, 'bm25')
+        try:
+            with open(os.path.join(bm25_dir, 'corpus_hash'), 'r', encoding='utf-8') as f:
+                if f.read().strip() != corpus_hash:
+                    return None
+            bm25 = bm25s.BM25.load(bm25_dir, show_progress=False, override_params={'backend': BM25_BACKEND})
+            logger.info("BM25 index loaded from cache")
+            return bm25
+        except (IOError, OSError, ValueError) as e:
+            logger.debug("No usable BM25 cache: %s", e)
+            return None
+
+    def save_cached_bm25(self, corpus_hash):
+        """Persist the BM25 index along with the hash of the corpus it was built from."""
+        if not self.cache_dir:
+            return
 
-    def tokenize(self, text):
-        """Tokenize text into words for BM25."""
-        return text.split(" ")
+        bm25_dir = os.path.join(self.cache_dir, 'bm25')
+        try:
+            self.bm25.save(bm25_dir, show_progress=False)
+            with open(os.path.join(bm25_dir, 'corpus_hash'), 'w', encoding='utf-8') as f:
+                f.write(corpus_hash)
+        except (IOError, OSError) as e:
+            logger.warning("Could not save BM25 cache: %s", e)
+
+    def directory_hash(self, documents_dir):
+        """Return a digest of the embedding model and the supported files in a directory."""
+        files = []
+        if os.path.exists(documents_dir):
+            with os.scandir(documents_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and os.path.splitext(entry.name)[1].lower() in SUPPORTED_LOADERS:
+                        stats = entry.stat()
+                        files.append((entry.name, stats.st_mtime_ns, stats.st_size))
+        files.sort()
+        return hashlib.blake2b(repr((self.model_name, self.INDEX_METRIC, files)).encode('utf-8'), digest_size=16).hexdigest()
+
+    def load_cached_index(self, directory_hash):
+        """Restore documents, embeddings and indices saved for the same directory contents.
+
+        Returns True when the cache was used.
+        """
+        if not self.cache_dir:
+            return False
+
+        prefix = os.path.join(self.cache_dir, 'index', directory_hash)
+        try:
+            with open(f"{prefix}.docs.json", 'r', encoding='utf-8') as f:
+                documents = json.load(f)
+            # Memory-mapped: rows are paged in on use instead of read up front
+            embeddings = np.load(f"{prefix}.emb.npy", mmap_mode='r')
+            faiss_index = faiss.read_index(f"{prefix}.faiss")
+            with open(f"{prefix}.meta.json", 'r', encoding='utf-8') as f:
+                trained_count = json.load(f)['trained_count']
+        except (IOError, OSError, ValueError, KeyError, TypeError, RuntimeError) as e:
+            logger.debug("No usable index cache: %s", e)
+            return False
+        if not documents or not len(documents) == len(embeddings) == faiss_index.ntotal:
+            logger.debug("Index cache doesn't match its documents, ignoring it")
+            return False
+
+        self.documents = documents
+        try:
+            self.build_bm25_index()
+        except Exception as e:
+            logger.debug("Could not build BM25 from the index cache: %s", e)
+            return False
+        self.embeddings = embeddings
+        self.document_embeddings = dict(zip(map(self.document_key, documents), embeddings))
+        self.faiss_index = faiss_index
+        self.faiss_trained_count = trained_count
+        self.is_initialized = True
+        logger.info("Hybrid index loaded from cache with %d documents", len(documents))
+        return True
+
+    def save_cached_index(self, directory_hash):
+        """Persist documents, embeddings and the FAISS index, replacing older snapshots."""
+        if not self.cache_dir or not self.documents or self.embeddings is None or self.faiss_index is None:
+            return
+
+        index_dir = os.path.join(self.cache_dir, 'index')
+        prefix = os.path.join(index_dir, directory_hash)
+        try:
+            os.makedirs(index_dir, exist_ok=True)
+            with open(f"{prefix}.docs.json", 'w', encoding='utf-8') as f:
+                json.dump(self.documents, f)
+            np.save(f"{prefix}.emb.npy", self.embeddings)
+            faiss.write_index(self.faiss_index, f"{prefix}.faiss")
+            # ntotal also counts vectors added since training, which the quantizer may not cover
+            with open(f"{prefix}.meta.json", 'w', encoding='utf-8') as f:
+                json.dump({'trained_count': self.faiss_trained_count}, f)
+        except (IOError, OSError, RuntimeError) as e:
+            logger.warning("Could not save index cache: %s", e)
+            return
+
+        # Snapshots are never overwritten in place, a memory-mapped one may still be open
+        with os.scandir(index_dir) as entries:
+            for entry in entries:
+                if not entry.name.startswith(directory_hash):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
 
     def create_embeddings(self, texts):
         """Create embeddings for a list of texts using the sentence transformer."""
@@ -110,63 +282,184 @@ class RAGHandler:
 
         try:
             logger.info("Creating embeddings for %d documents", len(texts))
-            embeddings = self.model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+            embeddings = self.model.encode(
+                texts, batch_size=64, show_progress_bar=False, convert_to_numpy=True, normalize_embeddings=True
+            )
             logger.info("Embeddings created successfully")
             return embeddings
         except Exception as e:
             logger.error("Error creating embeddings: %s", e)
             return None
 
+    @staticmethod
+    def document_key(doc):
+        """Return a stable key identifying a document's content."""
+        return hashlib.blake2b(doc.encode('utf-8'), digest_size=16).hexdigest()
+
+    def create_document_embeddings(self, documents):
+        """Embed documents, only encoding the ones that aren't in the embedding cache yet."""
+        keys = [self.document_key(doc) for doc in documents]
+        new_docs = {}
+        for key, doc in zip(keys, documents):
+            if key not in self.document_embeddings:
+                new_docs[key] = doc
+
+        if new_docs:
+            new_embeddings = self.create_embeddings(list(new_docs.values()))
+            if new_embeddings is None:
+                return None
+            self.document_embeddings.update(zip(new_docs, new_embeddings))
+        else:
+            logger.info("All %d document embeddings reused from cache", len(documents))
+
+        # Drop embeddings of documents that were removed
+        self.document_embeddings = {key: self.document_embeddings[key] for key in keys}
+        return np.vstack([self.document_embeddings[key] for key in keys])
+
+    def embed_query(self, query):
+        """Return the embedding of a query, reusing it for repeated questions."""
+        embedding = self.query_embeddings.get(query)
+        if embedding is not None:
+            self.query_embeddings.move_to_end(query)
+            return embedding
+
+        embedding = self.create_embeddings([query])
+        if embedding is not None:
+            self.query_embeddings[query] = embedding
+            if len(self.query_embeddings) > self.QUERY_CACHE_SIZE:
+                self.query_embeddings.popitem(last=False)
+        return embedding
+
     def build_faiss_index(self, embeddings):
-        """Build FAISS index from embeddings."""
+        """Build an approximate FAISS index from embeddings, sized to the corpus."""
         try:
-            dimension = embeddings.shape[1]
-            # Use L2 distance (Euclidean) for similarity
-            index = faiss.IndexFlatL2(dimension)
-            index.add(embeddings.astype('float32'))
+            num_vectors, dimension = embeddings.shape
+            embeddings = embeddings.astype('float32', copy=False)
+            if num_vectors < self.HNSW_MAX_VECTORS:
+                # HNSW graph over int8 scalar-quantized vectors: sublinear search and
+                # 4x fewer bytes per vector than float32; faiss learns the per-dimension ranges
+                index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, 32, self.INDEX_METRIC)
+                index.hnsw.efConstruction = 200
+                index.hnsw.efSearch = 64
+                index.train(embeddings)
+            else:
+                # Inverted lists with product quantization: far smaller vectors for large corpora
+                index = faiss.index_factory(dimension, self.IVF_PQ_FACTORY, self.INDEX_METRIC)
+                index.train(embeddings)
+                faiss.extract_index_ivf(index).nprobe = 10
+            index.add(embeddings)
             logger.info("FAISS index built with %d vectors", index.ntotal)
             return index
         except Exception as e:
             logger.error("Error building FAISS index: %s", e)
             return None
 
+    def build_bm25_index(self):
+        """Build (or load from cache) the BM25 index over all current documents."""
+        # Scores are precomputed at index time
+        corpus_hash = self.corpus_hash()
+        self.bm25 = self.load_cached_bm25(corpus_hash)
+        if self.bm25 is None:
+            # Lowercasing happens inside the tokenizer, in the same pass
+            tokenized_corpus = self.tokenize(self.documents)
+            self.bm25 = bm25s.BM25(backend=BM25_BACKEND)
+            self.bm25.index(tokenized_corpus, show_progress=False)
+            self.save_cached_bm25(corpus_hash)
+        self.bm25_pending = 0
+        if self.bm25.backend == 'numba':
+            # Compile the JIT scorer now so the first user query doesn't pay for it.
+            # Use a real vocabulary token: the numba path doesn't bounds-check the empty one
+            self.bm25.retrieve([[next(iter(self.bm25.vocab_dict))]], k=1, show_progress=False)
+        logger.info("BM25 index updated successfully")
+
     def update_index(self):
         """Update both BM25 and FAISS indices with current documents."""
         if not self.documents:
+            # Nothing left to search: don't keep (or snapshot) the previous corpus' indices
+            self.bm25 = None
+            self.bm25_pending = 0
+            self.faiss_index = None
+            self.embeddings = None
+            self.document_embeddings = {}
             self.is_initialized = False
             return
 
         try:
             # 1. Update BM25 index (lexical search)
-            self.corpus = [self.preprocess_text(doc) for doc in self.documents]
-            tokenized_corpus = [self.tokenize(doc) for doc in self.corpus]
-            self.bm25 = BM25Okapi(tokenized_corpus)
-            logger.info("BM25 index updated successfully")
+            self.build_bm25_index()
 
             # 2. Update FAISS index (semantic search)
-            self.embeddings = self.create_embeddings(self.documents)
+            self.embeddings = self.create_document_embeddings(self.documents)
             if self.embeddings is not None:
                 self.faiss_index = self.build_faiss_index(self.embeddings)
+                self.faiss_trained_count = len(self.embeddings)
                 self.is_initialized = True
                 logger.info("Hybrid index (BM25 + FAISS) updated successfully")
             else:
                 logger.warning("Failed to create embeddings, falling back to BM25 only")
+                # The previous index no longer matches the documents
+                self.faiss_index = None
                 self.is_initialized = True  # Still usable with BM25
         except Exception as e:
             logger.error("Error updating indices: %s", e)
             self.is_initialized = False
 
+    def publish_index(self):
+        """Make the current documents and indices visible to queries in a single assignment."""
+        if self.is_initialized:
+            self.search_index = SearchIndex(self.documents, self.bm25, self.bm25_pending, self.faiss_index)
+        else:
+            self.search_index = None
+
     def initialize(self, documents_dir):
         """Initialize or reinitialize the RAG system with documents from a directory."""
         try:
+            directory_hash = self.directory_hash(documents_dir)
+            if self.load_cached_index(directory_hash):
+                return
+
             logger.info("Loading documents from: %s", documents_dir)
             documents = load_documents_from_directory(documents_dir)
             self.documents = documents
             self.update_index()
+            self.save_cached_index(directory_hash)
             logger.info("Initialized with %s documents", len(documents))
         except (IOError, OSError) as e:
             logger.error("Error initializing RAG: %s", e)
             self.is_initialized = False
+        finally:
+            self.publish_index()
+
+    def update_index_incremental(self, new_documents):
+        """Append already-stored new documents to the indices without a full rebuild.
+
+        Falls back to update_index() when there is no index to extend yet, when the
+        corpus outgrows the HNSW index and needs an IVF-PQ one instead, or when the
+        quantizer ranges learnt from a much smaller corpus would clip the new vectors.
+        """
+        previous_count = len(self.documents) - len(new_documents)
+        if (not self.is_initialized or self.faiss_index is None
+                or previous_count < self.HNSW_MAX_VECTORS <= len(self.documents)
+                or len(self.documents) > self.FAISS_RETRAIN_RATIO * self.faiss_trained_count):
+            self.update_index()
+            return
+
+        # 1. FAISS: only the new documents are encoded; trained indexes accept new vectors as-is
+        new_embeddings = self.create_embeddings(new_documents)
+        if new_embeddings is None:
+            self.update_index()
+            return
+        self.document_embeddings.update(zip(map(self.document_key, new_documents), new_embeddings))
+        self.embeddings = np.vstack([self.embeddings, new_embeddings])
+        # Extend a copy: queries may be searching the published index meanwhile
+        self.faiss_index = faiss.clone_index(self.faiss_index)
+        self.faiss_index.add(new_embeddings.astype('float32', copy=False))
+
+        # 2. BM25 can't be extended, rebuild it once enough documents are missing from it
+        self.bm25_pending += len(new_documents)
+        if self.bm25_pending > self.BM25_REBUILD_RATIO * len(self.documents):
+            self.build_bm25_index()
+        logger.info("Hybrid index extended to %d documents", len(self.documents))
 
     def add_documents(self, new_documents):
         """Add new documents and update the index."""
@@ -174,11 +467,32 @@ class RAGHandler:
             return
 
         try:
-            self.documents.extend(new_documents)
-            self.update_index()
+            # A new list: the published SearchIndex still holds the previous one
+            self.documents = self.documents + new_documents
+            self.update_index_incremental(new_documents)
             logger.info("Added %s new documents", len(new_documents))
-        except (ValueError, TypeError) as e:
+        except (ValueError, TypeError, RuntimeError) as e:
             logger.error("Error adding documents: %s", e)
+        finally:
+            self.publish_index()
+
+    def reindex_incremental(self, file_paths):
+        """Load only the given files of the indexed directory and add their content to the existing index."""
+        new_documents = []
+        for file_path in file_paths:
+            new_documents.extend(load_document(file_path))
+        self.add_documents(new_documents)
+
+        if new_documents and self.is_initialized:
+            # The directory changed: snapshot it so the next start doesn't re-encode everything
+            self.save_cached_index(self.directory_hash(os.path.dirname(file_paths[0])))
+
+    def is_bm25_decisive(self, bm25_scores, top_n):
+        """Whether BM25's top_n results all match and clearly outscore the rest of the corpus."""
+        if self.bm25_decisive_ratio is None or len(bm25_scores) <= top_n:
+            return False
+        last_hit = bm25_scores[top_n - 1]
+        return last_hit > 0 and last_hit > self.bm25_decisive_ratio * bm25_scores[top_n]
 
     def get_relevant_documents(self, query, top_n=2):
         """
@@ -186,55 +500,58 @@ class RAGHandler:
 
         Uses Reciprocal Rank Fusion (RRF) to combine results from both methods.
         """
-        if not self.is_initialized:
+        # A single read: index updates publish a new SearchIndex instead of mutating this one
+        index = self.search_index
+        if index is None:
             return []
 
         try:
-            results = {}
+            scores = np.zeros(len(index.documents))
 
             # 1. BM25 (Lexical) Search
-            tokenized_query = self.tokenize(self.preprocess_text(query))
-            bm25_scores = self.bm25.get_scores(tokenized_query)
-
-            # Get top documents from BM25
-            bm25_top_indices = np.argsort(bm25_scores)[::-1][:top_n * 2]  # Get more for fusion
-
-            # Add BM25 results with RRF scoring
-            for rank, idx in enumerate(bm25_top_indices):
-                doc_id = idx
-                # RRF formula: 1 / (rank + k), where k=60 is standard
-                rrf_score = 1 / (rank + 60)
-                if doc_id in results:
-                    results[doc_id] += rrf_score
-                else:
-                    results[doc_id] = rrf_score
+            tokenized_query = self.tokenize([query])
+
+            # Get top documents from BM25, more than top_n for fusion
+            self.query_count += 1
+            bm25_top_indices = []
+            if tokenized_query[0]:  # the numba backend rejects queries with no tokens
+                # Documents added since the last BM25 build aren't in it yet
+                k = min(top_n * 2, len(index.documents) - index.bm25_pending)
+                bm25_results, bm25_scores = index.bm25.retrieve(tokenized_query, k=k, show_progress=False)
+                bm25_top_indices = bm25_results[0]
+
+                # New documents missing from BM25 could beat its results
+                if not index.bm25_pending and self.is_bm25_decisive(bm25_scores[0], top_n):
+                    self.bm25_decisive_count += 1
+                    logger.info("BM25 result is decisive, skipping semantic search (%d/%d queries)",
+                                self.bm25_decisive_count, self.query_count)
+                    return [index.documents[idx] for idx in bm25_top_indices[:top_n]]
+
+            # Add BM25 results with RRF scoring, each document appears at most once per list
+            scores[bm25_top_indices] += RRF_WEIGHTS[:len(bm25_top_indices)]
 
             # 2. FAISS (Semantic) Search
-            if self.faiss_index is not None:
-                query_embedding = self.create_embeddings([query])
+            if index.faiss_index is not None:
+                query_embedding = self.embed_query(query)
                 if query_embedding is not None:
                     # Search FAISS index
-                    distances, indices = self.faiss_index.search(
-                        query_embedding.astype('float32'),
+                    _, indices = index.faiss_index.search(
+                        query_embedding.astype('float32', copy=False),
                         top_n * 2
                     )
 
-                    # Add FAISS results with RRF scoring
-                    for rank, idx in enumerate(indices[0]):
-                        if idx != -1:  # Valid index
-                            doc_id = int(idx)
-                            rrf_score = 1 / (rank + 60)
-                            if doc_id in results:
-                                results[doc_id] += rrf_score
-                            else:
-                                results[doc_id] = rrf_score
+                    # Add FAISS results with RRF scoring, -1 only pads the end of the list
+                    valid = indices[0][indices[0] != -1]
+                    scores[valid] += RRF_WEIGHTS[:len(valid)]
 
-            # 3. Combine and rank results
-            sorted_results = sorted(results.items(), key=lambda x: x[1], reverse=True)
-            top_doc_indices = [doc_id for doc_id, _ in sorted_results[:top_n]]
+            # 3. Combine and rank results, only the top_n candidates get sorted
+            top_doc_indices = np.flatnonzero(scores)
+            if len(top_doc_indices) > top_n:
+                top_doc_indices = top_doc_indices[np.argpartition(-scores[top_doc_indices], top_n)[:top_n]]
+            top_doc_indices = top_doc_indices[np.argsort(-scores[top_doc_indices], kind='stable')]
 
             # Return top documents
-            top_docs = [self.documents[idx] for idx in top_doc_indices if idx < len(self.documents)]
+            top_docs = [index.documents[idx] for idx in top_doc_indices]
 
             logger.info("Hybrid search for query: %s", query)
             logger.info("Retrieved %d documents", len(top_docs))